@@ -1,11 +1,35 @@
 import os
-from typing import List, Dict, Any, Optional, Union
+import asyncio
+
+# Cores available to this process.  When several worker processes are run
+# (WEB_CONCURRENCY), the cores are divided between them so that the workers'
+# thread pools together do not oversubscribe the host.
+WORKER_THREADS = max(1, (os.cpu_count() or 1) // max(1, int(os.environ.get("WEB_CONCURRENCY", "1"))))
+
+# Allow the Rust tokenizers backend to parallelize batch encoding across this
+# process's cores; this must be set before transformers/tokenizers are imported
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+os.environ.setdefault("RAYON_NUM_THREADS", str(WORKER_THREADS))
+
+from typing import List, Dict, Any, Optional, Tuple, Union
 import uvicorn
+import anyio
+import orjson
+import tiktoken
 from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-from transformers import AutoTokenizer
+from transformers import AutoTokenizer, PreTrainedTokenizerFast
+from transformers.convert_slow_tokenizer import convert_slow_tokenizer
+from tokenizers import Tokenizer, models, pre_tokenizers
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import threading
 import logging
 import hashlib
+import bisect
+import json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,25 +41,89 @@ MODELS_DIR = "./models"
 # Ensure models directory exists
 os.makedirs(MODELS_DIR, exist_ok=True)
 
+# Keep downloaded tiktoken encodings alongside the Hugging Face models
+os.environ.setdefault("TIKTOKEN_CACHE_DIR", os.path.join(MODELS_DIR, "tiktoken"))
+
+# OpenAI models and encodings that are tokenized with tiktoken rather than Hugging Face
+TIKTOKEN_ENCODINGS = {
+    "o200k_base": "o200k_base",
+    "cl100k_base": "cl100k_base",
+    "p50k_base": "p50k_base",
+    "r50k_base": "r50k_base",
+    "gpt-4o": "o200k_base",
+    "gpt-4o-mini": "o200k_base",
+    "gpt-4": "cl100k_base",
+    "gpt-4-turbo": "cl100k_base",
+    "gpt-3.5-turbo": "cl100k_base",
+    "text-embedding-3-small": "cl100k_base",
+    "text-embedding-3-large": "cl100k_base",
+    "text-embedding-ada-002": "cl100k_base",
+    "text-davinci-003": "p50k_base",
+    "text-davinci-002": "p50k_base",
+    "code-davinci-002": "p50k_base",
+    "davinci": "r50k_base",
+}
+
+# Number of independent tokenizer instances to shard large batches across.
+# Each shard handles roughly 32 cores; smaller hosts use a single instance.
+SHARD_COUNT = max(1, WORKER_THREADS // 32)
+
+# Batches smaller than this are always encoded on the single shared instance
+SHARD_MIN_BATCH = 64
+
+# Limits how many requests are tokenized concurrently in worker threads,
+# created at startup since it must be bound to the running event loop
+tokenize_limiter = None
+
+# Maximum number of tokenizers kept loaded; least recently used ones are evicted
+TOKENIZER_CACHE_SIZE = int(os.environ.get("TOKENIZER_CACHE_SIZE", "32"))
+
+# Number of texts tokenized per batch when streaming results
+STREAM_BATCH_SIZE = 32
+
+# Comma-separated list of models to load at startup, before serving requests
+PRELOAD_MODELS = [model.strip() for model in os.environ.get("PRELOAD_MODELS", "").split(",") if model.strip()]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Size the pool of tokenization worker threads to this process's share of the
+    cores, and load the tokenizers listed in PRELOAD_MODELS before the service starts
+    accepting requests, so the first request for each model does not pay the
+    download cost.
+    """
+    global tokenize_limiter
+    tokenize_limiter = anyio.CapacityLimiter(WORKER_THREADS)
+    
+    loop = asyncio.get_running_loop()
+    
+    for model_name in PRELOAD_MODELS:
+        try:
+            logger.info(f"preloading tokenizer for model: {model_name}")
+            await loop.run_in_executor(None, get_tokenizer, model_name)
+        except Exception as e:
+            logger.error(f"error preloading tokenizer for model {model_name}: {str(e)}")
+    
+    yield
+
 # Initialize FastAPI app
-app = FastAPI(title="Model Tokenizer Microservice")
+app = FastAPI(title="Model Tokenizer Microservice", lifespan=lifespan)
 
-# Define request and response models
-class SingleTextTokenizeRequest(BaseModel):
+# Define request and response models.  Responses are built as plain dictionaries;
+# the response models below only document the API schema.
+class TokenizeRequest(BaseModel):
     model: str
-    text: str
     huggingface_api_key: Optional[str] = None  # Optional Hugging Face API key
     max_chunk_length: Optional[int] = None  # Maximum character length per chunk
     max_tokens_per_chunk: Optional[int] = None  # Maximum tokens per chunk
     token_overlap: int = 0  # Number of tokens to overlap between chunks
+    as_ids: bool = False  # Return token IDs instead of token strings
 
-class MultiTextTokenizeRequest(BaseModel):
-    model: str
+class SingleTextTokenizeRequest(TokenizeRequest):
+    text: str
+
+class MultiTextTokenizeRequest(TokenizeRequest):
     texts: List[str]
-    huggingface_api_key: Optional[str] = None  # Optional Hugging Face API key
-    max_chunk_length: Optional[int] = None  # Maximum character length per chunk
-    max_tokens_per_chunk: Optional[int] = None  # Maximum tokens per chunk
-    token_overlap: int = 0  # Number of tokens to overlap between chunks
 
 class Chunk(BaseModel):
     text: str
@@ -48,58 +136,188 @@ class TokenizedItem(BaseModel):
     text: str
     sha256: str
     token_count: int
-    tokens: List[str]
+    tokens: Union[List[str], List[int]]
     chunks: List[Chunk]
 
 class SingleTextTokenizeResponse(BaseModel):
     text: str
     sha256: str
     token_count: int
-    tokens: List[str]
+    tokens: Union[List[str], List[int]]
     chunks: List[Chunk]
 
 class MultiTextTokenizeResponse(BaseModel):
     results: List[TokenizedItem]
 
-# Create a cache for tokenizers to avoid reloading models
-tokenizer_cache = {}
+# Create a bounded LRU cache for tokenizers to avoid reloading models
+tokenizer_cache = OrderedDict()
+tokenizer_cache_lock = threading.Lock()
 
-def get_tokenizer(model_name: str, hf_api_key: Optional[str] = None):
+# Cloned backend tokenizers used to shard large batches, keyed like tokenizer_cache
+tokenizer_shards = {}
+
+# Executor used to encode shards concurrently; threads are only started on first use
+shard_executor = ThreadPoolExecutor(max_workers=SHARD_COUNT) if SHARD_COUNT > 1 else None
+
+# Maximum total number of tokens, across all texts, kept in the token cache
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "500000"))
+
+# Texts with more tokens than this are not cached, so a single long text
+# cannot evict a large part of the cache
+TOKEN_CACHE_MAX_TEXT_TOKENS = TOKEN_CACHE_SIZE // 100
+
+# Bounded LRU cache of (token_ids, tokens, offsets) keyed by (cache_key, text SHA-256),
+# so identical texts sent to the same model skip tokenization entirely
+token_cache = OrderedDict()
+token_cache_tokens = 0
+token_cache_lock = threading.Lock()
+
+# Prefix lengths (in characters) at which the tokenization of shared text prefixes,
+# such as a common system prompt, is cached and reused; longest first
+PREFIX_LENGTHS = (4096, 1024, 256)
+
+# Maximum number of prefix tokenizations kept in the prefix cache
+PREFIX_CACHE_SIZE = 256
+
+# Bounded LRU cache of (cut, token_ids, tokens, offsets) for the text before cut,
+# keyed by (cache_key, prefix length, BLAKE2b hash of the prefix)
+prefix_cache = OrderedDict()
+prefix_cache_lock = threading.Lock()
+
+# Bounded LRU set of prefix cache keys that have been looked up, so a prefix is only
+# cached once it repeats and a batch of unique texts cannot flush the prefix cache;
+# also guarded by prefix_cache_lock
+PREFIX_SEEN_SIZE = PREFIX_CACHE_SIZE * 16
+prefix_seen = OrderedDict()
+
+def get_cache_key(model_name: str, hf_api_key: Optional[str] = None) -> str:
     """
-    Load a tokenizer model, downloading it if necessary and caching it for reuse.
+    Build the key under which a tokenizer is cached.
+    """
+    # Include a hash of the API key (if provided) so we don't reuse a tokenizer
+    # loaded with a different API key, without keeping the raw key in the cache
+    if not hf_api_key:
+        return f"{model_name}|public"
+    return f"{model_name}|{hashlib.blake2b(hf_api_key.encode('utf-8'), digest_size=16).hexdigest()}"
+
+def convert_to_fast_tokenizer(model_name: str, slow_tokenizer) -> PreTrainedTokenizerFast:
+    """
+    Build a fast (Rust-backed) tokenizer from a slow (pure-Python) one.
+    
+    Raises:
+        HTTPException: 400 if the tokenizer cannot be converted
+    """
+    try:
+        logger.info(f"converting slow tokenizer to fast for model: {model_name}")
+        return PreTrainedTokenizerFast(
+            tokenizer_object=convert_slow_tokenizer(slow_tokenizer),
+            **slow_tokenizer.special_tokens_map
+        )
+    except Exception as e:
+        logger.error(f"no fast tokenizer available for model {model_name}: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Model {model_name} does not provide a fast tokenizer")
+
+def load_hf_tokenizer(model_name: str, hf_api_key: Optional[str] = None) -> PreTrainedTokenizerFast:
+    """
+    Load a fast tokenizer from Hugging Face, downloading it if necessary.
     
     Args:
         model_name: The name of the Hugging Face model to load
         hf_api_key: Optional Hugging Face API key for accessing private or gated models
     """
-    # Create a cache key that includes the API key (if provided)
-    # This ensures we don't reuse a tokenizer loaded with a different API key
-    cache_key = f"{model_name}_{hf_api_key if hf_api_key else 'public'}"
+    # Set the Hugging Face token if provided
+    if hf_api_key:
+        logger.info(f"using provided Hugging Face API key for model: {model_name}")
+        os.environ["HF_TOKEN"] = hf_api_key
+        token = hf_api_key
+    else:
+        token = None
     
-    if cache_key in tokenizer_cache:
-        logger.info(f"using cached tokenizer for model: {model_name}")
-        return tokenizer_cache[cache_key]
+    # Public models already present in the models directory are loaded
+    # without contacting the Hugging Face Hub
+    tokenizer = None
+    if not token:
+        try:
+            tokenizer = AutoTokenizer.from_pretrained(
+                model_name, 
+                cache_dir=MODELS_DIR,
+                local_files_only=True,
+                use_fast=True
+            )
+        except OSError:
+            logger.info(f"tokenizer for model {model_name} not found locally, downloading")
     
-    try:
-        logger.info(f"loading tokenizer for model: {model_name}")
-        
-        # Set the Hugging Face token if provided
-        if hf_api_key:
-            logger.info(f"using provided Hugging Face API key for model: {model_name}")
-            os.environ["HF_TOKEN"] = hf_api_key
-            token = hf_api_key
-        else:
-            token = None
-        
+    if tokenizer is None:
         tokenizer = AutoTokenizer.from_pretrained(
             model_name, 
             cache_dir=MODELS_DIR,
             local_files_only=False,  # This will download if not present
+            use_fast=True,
             token=token  # Using 'token' instead of 'use_auth_token'
         )
+    
+    # Only serve Rust-backed tokenizers; pure-Python tokenizers are far slower
+    if not isinstance(tokenizer, PreTrainedTokenizerFast):
+        tokenizer = convert_to_fast_tokenizer(model_name, tokenizer)
+    
+    # Texts are encoded through the Rust backend directly, so clear any truncation
+    # or padding saved with the tokenizer; every text is tokenized in full
+    tokenizer.backend_tokenizer.no_truncation()
+    tokenizer.backend_tokenizer.no_padding()
+    
+    return tokenizer
+
+def get_tokenizer(model_name: str, hf_api_key: Optional[str] = None):
+    """
+    Load a tokenizer model, downloading it if necessary and caching it for reuse.
+    OpenAI models and encodings listed in TIKTOKEN_ENCODINGS are served by tiktoken.
+    
+    Args:
+        model_name: The name of the Hugging Face model (or OpenAI model or encoding) to load
+        hf_api_key: Optional Hugging Face API key for accessing private or gated models
+    """
+    cache_key = get_cache_key(model_name, hf_api_key)
+    
+    with tokenizer_cache_lock:
+        if cache_key in tokenizer_cache:
+            logger.info(f"using cached tokenizer for model: {model_name}")
+            tokenizer_cache.move_to_end(cache_key)
+            return tokenizer_cache[cache_key]
+    
+    try:
+        logger.info(f"loading tokenizer for model: {model_name}")
+        
+        if model_name in TIKTOKEN_ENCODINGS:
+            logger.info(f"using tiktoken encoding {TIKTOKEN_ENCODINGS[model_name]} for model: {model_name}")
+            tokenizer = TiktokenTokenizer(tiktoken.get_encoding(TIKTOKEN_ENCODINGS[model_name]))
+        else:
+            tokenizer = load_hf_tokenizer(model_name, hf_api_key)
+        
+        # Clone the backend tokenizer so large batches can be sharded across
+        # independent instances rather than contending on a single one
+        shards = None
+        if SHARD_COUNT > 1 and isinstance(tokenizer, PreTrainedTokenizerFast):
+            serialized = tokenizer.backend_tokenizer.to_str()
+            shards = [Tokenizer.from_str(serialized) for _ in range(SHARD_COUNT)]
+            for shard in shards:
+                shard.no_truncation()
+                shard.no_padding()
+        
+        with tokenizer_cache_lock:
+            tokenizer_cache[cache_key] = tokenizer
+            tokenizer_cache.move_to_end(cache_key)
+            if shards is not None:
+                tokenizer_shards[cache_key] = shards
+            
+            # Evict the least recently used tokenizers if the cache is full
+            while len(tokenizer_cache) > TOKENIZER_CACHE_SIZE:
+                evicted_key, _ = tokenizer_cache.popitem(last=False)
+                tokenizer_shards.pop(evicted_key, None)
+                logger.info("evicted least recently used tokenizer from cache")
         
-        tokenizer_cache[cache_key] = tokenizer
         return tokenizer
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"error loading tokenizer for model {model_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to load tokenizer: {str(e)}")
@@ -111,15 +329,130 @@ def tokenize_text(tokenizer, text: str) -> List[str]:
     encoded = tokenizer.encode(text, add_special_tokens=False)
     return tokenizer.convert_ids_to_tokens(encoded)
 
+def get_chunk_text(
+    text: str, 
+    offsets: List[Tuple[int, int]],
+    start_idx: int,
+    end_idx: int
+) -> str:
+    """
+    Get the text covered by the tokens from start_idx to end_idx (inclusive),
+    sliced directly from the original text using the tokens' character offsets.
+    """
+    return text[offsets[start_idx][0]:offsets[end_idx][1]]
+
+def get_chunk_sha256(
+    chunk_text: str,
+    text_view: memoryview,
+    byte_offsets: Optional[List[Tuple[int, int]]],
+    start_idx: int,
+    end_idx: int
+) -> str:
+    """
+    Compute the SHA-256 hash of a chunk's text.
+    
+    When byte offsets are available the chunk's bytes are hashed straight from
+    a view of the already-encoded original text, without copying or re-encoding.
+    """
+    if byte_offsets is not None:
+        return hashlib.sha256(text_view[byte_offsets[start_idx][0]:byte_offsets[end_idx][1]]).hexdigest()
+    return hashlib.sha256(chunk_text.encode('utf-8')).hexdigest()
+
+def get_chunk_spans(
+    text: str, 
+    token_ids: List[int], 
+    offsets: List[Tuple[int, int]],
+    max_chunk_length: Optional[int] = None,
+    max_tokens_per_chunk: Optional[int] = None,
+    token_overlap: int = 0
+) -> List[Tuple[int, int]]:
+    """
+    Compute the token ranges (start_idx, end_idx inclusive) of each chunk, honoring
+    token and character limits with the specified overlap.
+    """
+    # Set default values if only one parameter is provided
+    if max_chunk_length is None:
+        max_chunk_length = float('inf')  # No character limit
+    if max_tokens_per_chunk is None:
+        max_tokens_per_chunk = float('inf')  # No token limit
+    
+    # Character end offset of each token, used to find how many tokens fit
+    # within the character limit with a binary search
+    char_ends = None
+    if max_chunk_length != float('inf'):
+        char_ends = [offset[1] for offset in offsets]
+    
+    spans = []
+    i = 0
+    
+    while i < len(token_ids):
+        # Determine how many tokens to include in this chunk
+        chunk_size = min(max_tokens_per_chunk, len(token_ids) - i)
+        
+        # Shrink the chunk to respect the character limit, always keeping at least one token
+        if char_ends is not None:
+            fit = bisect.bisect_right(char_ends, offsets[i][0] + max_chunk_length, i) - i
+            chunk_size = max(1, min(chunk_size, fit))
+        
+        # Calculate start and end indices for this chunk
+        start_idx = i
+        end_idx = i + chunk_size - 1  # -1 because end index is inclusive
+        
+        # If this is not the first chunk and would be a small final chunk, extend
+        # the previous chunk to cover it if the result respects the character limit
+        if (
+            i > 0
+            and i + chunk_size >= len(token_ids)
+            and chunk_size < max_tokens_per_chunk / 2
+            and len(spans) > 0
+            and (
+                max_chunk_length == float('inf')
+                or len(get_chunk_text(text, offsets, spans[-1][0], end_idx)) <= max_chunk_length
+            )
+        ):
+            spans[-1] = (spans[-1][0], end_idx)
+            break
+        
+        spans.append((start_idx, end_idx))
+        
+        # If we've covered all tokens, break
+        if i + chunk_size >= len(token_ids):
+            break
+            
+        # Move to the next chunk, accounting for overlap
+        i += max(1, chunk_size - token_overlap)
+    
+    return spans
+
+def get_fixed_chunk_spans(token_count: int, max_tokens_per_chunk: int) -> List[Tuple[int, int]]:
+    """
+    Compute the token ranges (start_idx, end_idx inclusive) of fixed-size chunks
+    with no overlap and no character limit.  Produces the same ranges as
+    get_chunk_spans for that case without its per-chunk checks.
+    """
+    spans = [
+        (start_idx, min(start_idx + max_tokens_per_chunk, token_count) - 1)
+        for start_idx in range(0, token_count, max_tokens_per_chunk)
+    ]
+    
+    # Merge a small final chunk with the previous chunk
+    if len(spans) > 1 and spans[-1][1] - spans[-1][0] + 1 < max_tokens_per_chunk / 2:
+        spans[-2:] = [(spans[-2][0], spans[-1][1])]
+    
+    return spans
+
 def chunk_text(
     tokenizer, 
     text: str, 
     token_ids: List[int], 
-    tokens: List[str],
+    tokens: Optional[List[str]],
     max_chunk_length: Optional[int] = None,
     max_tokens_per_chunk: Optional[int] = None,
-    token_overlap: int = 0
-) -> List[Chunk]:
+    token_overlap: int = 0,
+    offsets: Optional[List[Tuple[int, int]]] = None,
+    text_bytes: Optional[bytes] = None,
+    text_sha256: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
     Chunk a text based on token and character limits with specified overlap.
     
@@ -127,99 +460,492 @@ def chunk_text(
         tokenizer: The tokenizer to use
         text: The original text to chunk
         token_ids: The token IDs from the tokenizer
-        tokens: The tokens from the tokenizer
+        tokens: The tokens from the tokenizer, if computed
         max_chunk_length: Maximum characters per chunk (if specified)
         max_tokens_per_chunk: Maximum tokens per chunk (if specified)
         token_overlap: Number of tokens to overlap between chunks
+        offsets: (start, end) character offsets of each token in the text, required
+            when a chunking limit is set
+        text_bytes: Optional UTF-8 encoding of the text, used for hashing
+        text_sha256: Optional precomputed SHA-256 hash of the text
     
     Returns:
-        List of chunks with their token counts and token indices
+        List of chunk dictionaries with their token counts and token indices
     """
+    if text_bytes is None:
+        text_bytes = text.encode('utf-8')
+    if text_sha256 is None:
+        text_sha256 = hashlib.sha256(text_bytes).hexdigest()
+    
+    # Character offsets are also byte offsets when the text is pure ASCII
+    text_view = memoryview(text_bytes)
+    byte_offsets = offsets if len(text_bytes) == len(text) else None
+    
     # If no chunking parameters are provided, return the entire text as one chunk
     if max_chunk_length is None and max_tokens_per_chunk is None:
-        return [Chunk(
-            text=text,
-            sha256=hashlib.sha256(text.encode('utf-8')).hexdigest(),
-            token_count=len(tokens),
-            token_index_start=0,
-            token_index_end=len(tokens) - 1 if tokens else 0
-        )]
+        return [{
+            "text": text,
+            "sha256": text_sha256,
+            "token_count": len(token_ids),
+            "token_index_start": 0,
+            "token_index_end": len(token_ids) - 1 if token_ids else 0
+        }]
     
-    # Set default values if only one parameter is provided
-    if max_chunk_length is None:
-        max_chunk_length = float('inf')  # No character limit
-    if max_tokens_per_chunk is None:
-        max_tokens_per_chunk = float('inf')  # No token limit
+    # Token ranges (start_idx, end_idx inclusive) of each chunk; chunk text and
+    # hashes are only computed once the final ranges are known
+    if max_chunk_length is None and token_overlap == 0 and max_tokens_per_chunk > 0:
+        spans = get_fixed_chunk_spans(len(token_ids), max_tokens_per_chunk)
+    else:
+        spans = get_chunk_spans(
+            text=text,
+            token_ids=token_ids,
+            offsets=offsets,
+            max_chunk_length=max_chunk_length,
+            max_tokens_per_chunk=max_tokens_per_chunk,
+            token_overlap=token_overlap
+        )
     
     chunks = []
-    i = 0
     
-    while i < len(tokens):
-        # Determine how many tokens to include in this chunk
-        chunk_size = min(max_tokens_per_chunk, len(tokens) - i)
+    for start_idx, end_idx in spans:
+        # Get the text for this chunk
+        chunk_text = get_chunk_text(text, offsets, start_idx, end_idx)
         
-        # Calculate start and end indices for this chunk
-        start_idx = i
-        end_idx = i + chunk_size - 1  # -1 because end index is inclusive
+        # Create the chunk
+        chunks.append({
+            "text": chunk_text,
+            "sha256": get_chunk_sha256(chunk_text, text_view, byte_offsets, start_idx, end_idx),
+            "token_count": end_idx - start_idx + 1,
+            "token_index_start": start_idx,
+            "token_index_end": end_idx
+        })
+    
+    return chunks
+
+# Tokenization result for a single text: (token_ids, tokens, offsets), where
+# tokens or offsets are None when they were not requested
+Encoded = Tuple[List[int], Optional[List[str]], Optional[List[Tuple[int, int]]]]
+
+class TiktokenTokenizer:
+    """
+    Adapter exposing a tiktoken encoding through the tokenizer interface used by
+    this service.  Special tokens are never added or recognized.
+    """
+    
+    def __init__(self, encoding):
+        self.encoding = encoding
+    
+    def encode(self, text: str, add_special_tokens: bool = False) -> List[int]:
+        return self.encoding.encode_ordinary(text)
+    
+    def decode(self, token_ids: List[int]) -> str:
+        return self.encoding.decode(token_ids)
+    
+    def convert_ids_to_tokens(self, token_ids: List[int]) -> List[str]:
+        return [
+            token_bytes.decode('utf-8', errors='replace')
+            for token_bytes in self.encoding.decode_tokens_bytes(token_ids)
+        ]
+    
+    def encode_batch(
+        self,
+        texts: List[str],
+        need_tokens: bool = True,
+        need_offsets: bool = True
+    ) -> List[Encoded]:
+        """
+        Tokenize a list of texts with tiktoken's native batch encoder.
         
-        # If this is not the first chunk and would be a small final chunk,
-        # merge it with the previous chunk if possible
-        if i > 0 and chunk_size < max_tokens_per_chunk / 2 and len(chunks) > 0:
-            # Get the last chunk
-            previous_chunk = chunks.pop()
-            
-            # Calculate the new token range
-            if token_overlap > 0:
-                new_start_idx = previous_chunk.token_index_start  # Keep the previous start
-                new_end_idx = end_idx  # Use the current end
-            else:
-                new_start_idx = previous_chunk.token_index_start  # Keep the previous start
-                new_end_idx = end_idx  # Use the current end
+        Token strings and offsets each take another pass over the tokens, so they
+        are only computed when requested.
+        """
+        # The batch encoder starts a thread pool on every call, which is wasted
+        # on a single text
+        if len(texts) == 1:
+            batch_ids = [self.encoding.encode_ordinary(texts[0])]
+        else:
+            batch_ids = self.encoding.encode_ordinary_batch(texts)
+        
+        results = []
+        
+        for text, token_ids in zip(texts, batch_ids):
+            tokens = self.convert_ids_to_tokens(token_ids) if need_tokens else None
             
-            # Create a combined chunk
-            combined_token_ids = token_ids[new_start_idx:new_end_idx+1]
-            combined_text = tokenizer.decode(combined_token_ids)
+            offsets = None
+            if need_offsets:
+                # tiktoken reports the start offset of each token; each token
+                # ends where the next one starts
+                _, starts = self.encoding.decode_with_offsets(token_ids)
+                ends = starts[1:] + [len(text)]
+                offsets = list(zip(starts, ends))
             
-            chunks.append(Chunk(
-                text=combined_text,
-                sha256=hashlib.sha256(combined_text.encode('utf-8')).hexdigest(),
-                token_count=len(combined_token_ids),
-                token_index_start=new_start_idx,
-                token_index_end=new_end_idx
-            ))
-            break
+            results.append((token_ids, tokens, offsets))
         
-        # Get the tokens for this chunk
-        chunk_tokens = tokens[start_idx:end_idx+1]
-        chunk_token_ids = token_ids[start_idx:end_idx+1]
+        return results
+
+def encode_shard(backend, texts: List[str]) -> List[Encoded]:
+    """
+    Tokenize a list of texts with a single Rust backend tokenizer.
+    """
+    encodings = backend.encode_batch(texts, add_special_tokens=False)
+    return [(encoding.ids, encoding.tokens, encoding.offsets) for encoding in encodings]
+
+def encode_texts(
+    tokenizer, 
+    texts: List[str],
+    shards: Optional[List[Tokenizer]] = None,
+    need_tokens: bool = True,
+    need_offsets: bool = True
+) -> List[Encoded]:
+    """
+    Tokenize a list of texts in a single batched call.
+    
+    Fast tokenizers are encoded directly through the Rust backend, which
+    parallelizes the batch across cores and returns token strings and character
+    offsets alongside the token IDs.  get_tokenizer only returns fast and tiktoken
+    tokenizers, so any other type is rejected.
+    
+    Args:
+        tokenizer: The tokenizer to use
+        texts: The texts to tokenize
+        shards: Optional cloned backend tokenizers to split large batches across
+        need_tokens: Whether token strings are needed; tokenizers that must
+            compute them separately skip them otherwise
+        need_offsets: Whether character offsets are needed; tokenizers that
+            must compute them separately skip them otherwise
+    
+    Returns:
+        List of (token_ids, tokens, offsets) tuples, in input order
+    """
+    if isinstance(tokenizer, TiktokenTokenizer):
+        return tokenizer.encode_batch(texts, need_tokens, need_offsets)
+    
+    if isinstance(tokenizer, PreTrainedTokenizerFast):
+        if not shards or len(texts) < SHARD_MIN_BATCH:
+            return encode_shard(tokenizer.backend_tokenizer, texts)
         
-        # Get the text for this chunk
-        chunk_text = tokenizer.decode(chunk_token_ids)
+        # Split the texts into contiguous parts, one per shard, so the
+        # results can be concatenated back in input order
+        part_size = -(-len(texts) // len(shards))
+        parts = [texts[i:i + part_size] for i in range(0, len(texts), part_size)]
         
-        # Create the chunk
-        chunks.append(Chunk(
-            text=chunk_text,
-            sha256=hashlib.sha256(chunk_text.encode('utf-8')).hexdigest(),
-            token_count=len(chunk_tokens),
-            token_index_start=start_idx,
-            token_index_end=end_idx
-        ))
+        results = []
+        for part_results in shard_executor.map(encode_shard, shards, parts):
+            results.extend(part_results)
+        return results
+    
+    raise TypeError(f"unsupported tokenizer type: {type(tokenizer).__name__}")
+
+def is_complete(tokenizer, encoded: Encoded, need_tokens: bool, need_offsets: bool) -> bool:
+    """
+    Check whether a tokenization result has the token strings and offsets a request needs.
+    
+    Only tiktoken results omit fields that were not requested; fast tokenizers
+    always return every field.
+    """
+    if not isinstance(tokenizer, TiktokenTokenizer):
+        return True
+    _, tokens, offsets = encoded
+    return (tokens is not None or not need_tokens) and (offsets is not None or not need_offsets)
+
+def get_cached_tokens(cache_key: str, text_sha256: str) -> Optional[Encoded]:
+    """
+    Look up previously computed (token_ids, tokens, offsets) for a text, marking it as recently used.
+    """
+    key = (cache_key, text_sha256)
+    with token_cache_lock:
+        cached = token_cache.get(key)
+        if cached is not None:
+            token_cache.move_to_end(key)
+        return cached
+
+def put_cached_tokens(cache_key: str, text_sha256: str, encoded: Encoded):
+    """
+    Store (token_ids, tokens, offsets) for a text, evicting the least recently used
+    entries until the cache holds at most TOKEN_CACHE_SIZE tokens.
+    """
+    global token_cache_tokens
+    
+    token_count = len(encoded[0])
+    if token_count > TOKEN_CACHE_MAX_TEXT_TOKENS:
+        return
+    
+    key = (cache_key, text_sha256)
+    with token_cache_lock:
+        previous = token_cache.pop(key, None)
+        if previous is not None:
+            token_cache_tokens -= len(previous[0])
         
-        # If we've covered all tokens, break
-        if i + chunk_size >= len(tokens):
-            break
+        token_cache[key] = encoded
+        token_cache_tokens += token_count
+        
+        while token_cache_tokens > TOKEN_CACHE_SIZE:
+            _, evicted = token_cache.popitem(last=False)
+            token_cache_tokens -= len(evicted[0])
+
+def trims_offsets(post_processor) -> bool:
+    """
+    Check whether a post-processor, or any processor in a sequence, trims whitespace
+    from token offsets.
+    """
+    def walk(config) -> bool:
+        if isinstance(config, dict):
+            return config.get("trim_offsets") is True or any(walk(value) for value in config.values())
+        if isinstance(config, list):
+            return any(walk(value) for value in config)
+        return False
+    
+    return walk(json.loads(post_processor.__getstate__()))
+
+def supports_prefix_reuse(tokenizer) -> bool:
+    """
+    Check whether a tokenizer produces the same tokens for a text as for its prefix
+    and suffix tokenized separately, when split at a point found by get_prefix_cut.
+    
+    This holds for byte-level BPE tokenizers that pre-tokenize with the GPT-2 style
+    regex and apply no normalizer, including the tiktoken encodings, since no
+    pre-token can span a space that follows a non-whitespace character.  Tokenizers
+    whose post-processor trims offsets are excluded, since a whitespace-only token
+    at the start of the suffix would be trimmed differently.
+    """
+    if isinstance(tokenizer, TiktokenTokenizer):
+        return True
+    if not isinstance(tokenizer, PreTrainedTokenizerFast):
+        return False
+    
+    backend = tokenizer.backend_tokenizer
+    pre_tokenizer = backend.pre_tokenizer
+    return (
+        backend.normalizer is None
+        and isinstance(backend.model, models.BPE)
+        and isinstance(pre_tokenizer, pre_tokenizers.ByteLevel)
+        and pre_tokenizer.use_regex
+        and (backend.post_processor is None or not trims_offsets(backend.post_processor))
+    )
+
+def get_prefix_cut(prefix: str) -> int:
+    """
+    Find the last position in a prefix where the text can be split without changing
+    its tokenization: a space between two non-whitespace characters.
+    
+    Returns:
+        The position of the space, or 0 if there is none
+    """
+    cut = prefix.rfind(' ', 1, len(prefix) - 1)
+    while cut > 0:
+        if not prefix[cut - 1].isspace() and not prefix[cut + 1].isspace():
+            return cut
+        cut = prefix.rfind(' ', 1, cut)
+    return 0
+
+def get_prefix_key(cache_key: str, text: str, length: int) -> Tuple[str, int, str]:
+    """
+    Build the prefix cache key for the first length characters of a text.
+    """
+    digest = hashlib.blake2b(text[:length].encode('utf-8'), digest_size=16).hexdigest()
+    return (cache_key, length, digest)
+
+def get_cached_prefix(
+    cache_key: str,
+    text: str
+) -> Tuple[Optional[Tuple[int, Encoded]], Optional[Tuple[str, int, str]]]:
+    """
+    Look up the longest cached prefix tokenization for a text, marking it as recently
+    used, and record the longer prefixes looked up as seen.
+    
+    Returns:
+        Tuple of the cut position and the (token_ids, tokens, offsets) of the text
+        before it, or None if no prefix of the text is cached, and the key of the
+        longest prefix that was seen before but is not cached yet, or None
+    """
+    repeated_key = None
+    
+    for length in PREFIX_LENGTHS:
+        if len(text) <= length:
+            continue
+        
+        key = get_prefix_key(cache_key, text, length)
+        with prefix_cache_lock:
+            cached = prefix_cache.get(key)
+            if cached is not None:
+                prefix_cache.move_to_end(key)
+                return (cached[0], cached[1:]), repeated_key
             
-        # Move to the next chunk, accounting for overlap
-        i += max(1, chunk_size - token_overlap)
+            if key in prefix_seen:
+                prefix_seen.move_to_end(key)
+                if repeated_key is None:
+                    repeated_key = key
+            else:
+                prefix_seen[key] = None
+                while len(prefix_seen) > PREFIX_SEEN_SIZE:
+                    prefix_seen.popitem(last=False)
     
-    return chunks
+    return None, repeated_key
+
+def put_cached_prefix(key: Tuple[str, int, str], cut: int, encoded: Encoded):
+    """
+    Store the tokenization of the text before cut under a prefix cache key, evicting
+    the least recently used entries if full.
+    """
+    with prefix_cache_lock:
+        prefix_cache[key] = (cut,) + tuple(encoded)
+        prefix_cache.move_to_end(key)
+        prefix_seen.pop(key, None)
+        while len(prefix_cache) > PREFIX_CACHE_SIZE:
+            prefix_cache.popitem(last=False)
+
+def encode_texts_with_prefixes(
+    tokenizer, 
+    texts: List[str],
+    cache_key: str,
+    shards: Optional[List[Tokenizer]] = None,
+    need_tokens: bool = True,
+    need_offsets: bool = True
+) -> List[Encoded]:
+    """
+    Tokenize a list of texts in a single batched call, reusing cached tokenizations
+    of shared prefixes so only the remainder of each text is tokenized.
+    
+    A prefix is cached the second time it is seen.  Its tokens are taken from the
+    text's result when that includes token strings and offsets, and otherwise
+    tokenized separately, so cached prefixes always have every field.
+    
+    Returns:
+        List of (token_ids, tokens, offsets) tuples, in input order
+    """
+    lookups = [get_cached_prefix(cache_key, text) for text in texts]
+    
+    # Tokenize only the text after the cut for texts with a cached prefix
+    inputs = [text[prefix[0]:] if prefix else text for text, (prefix, _) in zip(texts, lookups)]
+    encoded_inputs = encode_texts(tokenizer, inputs, shards, need_tokens, need_offsets)
+    
+    results = []
+    pending = []
+    
+    for text, (prefix, repeated_key), (token_ids, tokens, offsets) in zip(texts, lookups, encoded_inputs):
+        if prefix:
+            cut, (prefix_ids, prefix_tokens, prefix_offsets) = prefix
+            token_ids = prefix_ids + token_ids
+            if tokens is not None:
+                tokens = prefix_tokens + tokens
+            if offsets is not None:
+                offsets = prefix_offsets + [(start + cut, end + cut) for start, end in offsets]
+        
+        results.append((token_ids, tokens, offsets))
+        
+        if repeated_key is None:
+            continue
+        cut = get_prefix_cut(text[:repeated_key[1]])
+        if cut == 0:
+            continue
+        
+        if tokens is None or offsets is None:
+            pending.append((repeated_key, cut, text[:cut]))
+            continue
+        
+        # Tokens starting before the cut belong to the prefix
+        count = bisect.bisect_left([offset[0] for offset in offsets], cut)
+        if count > 0:
+            put_cached_prefix(repeated_key, cut, (token_ids[:count], tokens[:count], offsets[:count]))
+    
+    if pending:
+        pending_encoded = encode_texts(tokenizer, [prefix_text for _, _, prefix_text in pending], shards)
+        for (key, cut, _), encoded in zip(pending, pending_encoded):
+            put_cached_prefix(key, cut, encoded)
+    
+    return results
+
+def process_texts(
+    tokenizer, 
+    texts: List[str],
+    max_chunk_length: Optional[int] = None,
+    max_tokens_per_chunk: Optional[int] = None,
+    token_overlap: int = 0,
+    cache_key: Optional[str] = None,
+    as_ids: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Process a list of texts: tokenize them in a single batched call and chunk each
+    according to specified parameters.
+    
+    Args:
+        cache_key: Key of the tokenizer in the tokenizer cache; when provided,
+            tokenization results and shared prefixes are cached and shards are
+            used for large batches
+        as_ids: Return token IDs rather than token strings in the results
+    
+    Returns:
+        List of dictionaries with the original text, tokens, and chunks, in input order
+    """
+    # Encode each text once and calculate its SHA-256 hash
+    texts_bytes = [text.encode('utf-8') for text in texts]
+    text_hashes = [hashlib.sha256(text_bytes).hexdigest() for text_bytes in texts_bytes]
+    
+    # Token strings are only returned when IDs are not requested, and offsets are
+    # only used for chunking
+    need_tokens = not as_ids
+    need_offsets = max_chunk_length is not None or max_tokens_per_chunk is not None
+    
+    # Reuse cached tokenization results where available, unless they lack a
+    # field this request needs
+    encoded = [None] * len(texts)
+    if cache_key is not None:
+        for index, text_sha256 in enumerate(text_hashes):
+            cached = get_cached_tokens(cache_key, text_sha256)
+            if cached is not None and is_complete(tokenizer, cached, need_tokens, need_offsets):
+                encoded[index] = cached
+    
+    # Tokenize the remaining texts in one call to the tokenizer backend
+    missing = [index for index, cached in enumerate(encoded) if cached is None]
+    if missing:
+        shards = tokenizer_shards.get(cache_key) if cache_key is not None else None
+        missing_texts = [texts[index] for index in missing]
+        if cache_key is not None and supports_prefix_reuse(tokenizer):
+            missing_encoded = encode_texts_with_prefixes(
+                tokenizer, missing_texts, cache_key, shards, need_tokens, need_offsets
+            )
+        else:
+            missing_encoded = encode_texts(tokenizer, missing_texts, shards, need_tokens, need_offsets)
+        for index, result in zip(missing, missing_encoded):
+            encoded[index] = result
+            if cache_key is not None:
+                put_cached_tokens(cache_key, text_hashes[index], result)
+    
+    results = []
+    
+    for text, text_bytes, text_sha256, (token_ids, tokens, offsets) in zip(texts, texts_bytes, text_hashes, encoded):
+        # Create chunks
+        chunks = chunk_text(
+            tokenizer=tokenizer,
+            text=text,
+            token_ids=token_ids,
+            tokens=tokens,
+            max_chunk_length=max_chunk_length,
+            max_tokens_per_chunk=max_tokens_per_chunk,
+            token_overlap=token_overlap,
+            offsets=offsets,
+            text_bytes=text_bytes,
+            text_sha256=text_sha256
+        )
+        
+        results.append({
+            "text": text,
+            "sha256": text_sha256,
+            "token_count": len(token_ids),
+            "tokens": token_ids if as_ids else tokens,
+            "chunks": chunks
+        })
+    
+    return results
 
 def process_text(
     tokenizer, 
     text: str,
     max_chunk_length: Optional[int] = None,
     max_tokens_per_chunk: Optional[int] = None,
-    token_overlap: int = 0
+    token_overlap: int = 0,
+    cache_key: Optional[str] = None,
+    as_ids: bool = False
 ) -> Dict[str, Any]:
     """
     Process a single text: tokenize and chunk it according to specified parameters.
@@ -227,34 +953,67 @@ def process_text(
     Returns:
         Dictionary with the original text, tokens, and chunks
     """
-    # Calculate SHA-256 hash for the text
-    text_sha256 = hashlib.sha256(text.encode('utf-8')).hexdigest()
-    
-    # Tokenize the text
-    token_ids = tokenizer.encode(text, add_special_tokens=False)
-    tokens = tokenizer.convert_ids_to_tokens(token_ids)
-    
-    # Create chunks
-    chunks = chunk_text(
+    return process_texts(
         tokenizer=tokenizer,
-        text=text,
-        token_ids=token_ids,
-        tokens=tokens,
+        texts=[text],
         max_chunk_length=max_chunk_length,
         max_tokens_per_chunk=max_tokens_per_chunk,
-        token_overlap=token_overlap
+        token_overlap=token_overlap,
+        cache_key=cache_key,
+        as_ids=as_ids
+    )[0]
+
+def load_request_tokenizer(request: TokenizeRequest) -> Tuple[Any, str]:
+    """
+    Get the tokenizer for a request's model, using the API key if provided, along
+    with its cache key.  This is blocking, may download the tokenizer, and is run in
+    a worker thread outside tokenize_limiter so a slow load does not hold up
+    tokenization of other requests.
+    """
+    api_key = request.huggingface_api_key or None
+    return get_tokenizer(request.model, api_key), get_cache_key(request.model, api_key)
+
+def tokenize_texts(
+    request: TokenizeRequest,
+    texts: List[str],
+    tokenizer,
+    cache_key: str
+) -> List[Dict[str, Any]]:
+    """
+    Tokenize and chunk texts using a loaded tokenizer and the options from a request.
+    This is blocking and is run in a worker thread so it does not stall the event loop.
+    """
+    return process_texts(
+        tokenizer=tokenizer,
+        texts=texts,
+        max_chunk_length=request.max_chunk_length,
+        max_tokens_per_chunk=request.max_tokens_per_chunk,
+        token_overlap=request.token_overlap,
+        cache_key=cache_key,
+        as_ids=request.as_ids
     )
-    
-    return {
-        "text": text,
-        "sha256": text_sha256,
-        "token_count": len(tokens),
-        "tokens": tokens,
-        "chunks": chunks
-    }
 
-@app.post("/tokenize", response_model=Union[SingleTextTokenizeResponse, MultiTextTokenizeResponse])
-async def tokenize(request: Union[SingleTextTokenizeRequest, MultiTextTokenizeRequest]) -> Dict[str, Any]:
+def tokenize_request(
+    request: Union[SingleTextTokenizeRequest, MultiTextTokenizeRequest],
+    tokenizer,
+    cache_key: str
+) -> Dict[str, Any]:
+    """
+    Tokenize and chunk the text or texts in a request.  This is blocking and is
+    run in a worker thread so it does not stall the event loop.
+    """
+    # Check if this is a single text request or multiple texts request
+    if isinstance(request, SingleTextTokenizeRequest):
+        # Single text request
+        logger.info(f"processing single text with model: {request.model}")
+        return tokenize_texts(request, [request.text], tokenizer, cache_key)[0]
+    else:
+        # Multiple texts request
+        logger.info(f"processing {len(request.texts)} texts with model: {request.model}")
+        return {"results": tokenize_texts(request, request.texts, tokenizer, cache_key)}
+
+@app.post("/tokenize", responses={200: {"model": Union[SingleTextTokenizeResponse, MultiTextTokenizeResponse]}})
+async def tokenize(request: Union[SingleTextTokenizeRequest, MultiTextTokenizeRequest]) -> Response:
     """
     Tokenize and chunk the provided text or texts using the specified model.
     Supports two input formats:
@@ -266,53 +1025,69 @@ async def tokenize(request: Union[SingleTextTokenizeRequest, MultiTextTokenizeRe
     - max_tokens_per_chunk: Maximum tokens per chunk
     - token_overlap: Number of tokens to overlap between chunks
     - huggingface_api_key: API key for accessing private or gated models
+    - as_ids: Return token IDs instead of token strings
     """
     try:
-        model_name = request.model
-        
-        # Get the API key from the request body if provided
-        api_key = None
-        if hasattr(request, 'huggingface_api_key') and request.huggingface_api_key:
-            api_key = request.huggingface_api_key
-            
-        # Get chunking parameters
-        max_chunk_length = getattr(request, 'max_chunk_length', None)
-        max_tokens_per_chunk = getattr(request, 'max_tokens_per_chunk', None)
-        token_overlap = getattr(request, 'token_overlap', 0)
-        
-        # Get the tokenizer using the API key if provided
-        tokenizer = get_tokenizer(model_name, api_key)
-        
-        # Check if this is a single text request or multiple texts request
-        if hasattr(request, 'text'):
-            # Single text request
-            logger.info(f"processing single text with model: {model_name}")
-            return process_text(
-                tokenizer=tokenizer,
-                text=request.text,
-                max_chunk_length=max_chunk_length,
-                max_tokens_per_chunk=max_tokens_per_chunk,
-                token_overlap=token_overlap
-            )
-        else:
-            # Multiple texts request
-            logger.info(f"processing {len(request.texts)} texts with model: {model_name}")
-            results = []
-            
-            for text in request.texts:
-                result = process_text(
-                    tokenizer=tokenizer,
-                    text=text,
-                    max_chunk_length=max_chunk_length,
-                    max_tokens_per_chunk=max_tokens_per_chunk,
-                    token_overlap=token_overlap
-                )
-                results.append(result)
-            
-            return {"results": results}
+        tokenizer, cache_key = await anyio.to_thread.run_sync(load_request_tokenizer, request)
+        result = await anyio.to_thread.run_sync(
+            tokenize_request, request, tokenizer, cache_key, limiter=tokenize_limiter
+        )
+        # Serialize with orjson, which is much faster than the default JSON encoder
+        return Response(orjson.dumps(result), media_type="application/json")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"error during text processing: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Text processing failed: {str(e)}")
+
+@app.post("/tokenize/stream")
+async def tokenize_stream(request: Union[SingleTextTokenizeRequest, MultiTextTokenizeRequest]) -> StreamingResponse:
+    """
+    Tokenize and chunk the provided text or texts, streaming the results as
+    newline-delimited JSON with one object per text, in input order.  Accepts the
+    same request formats and parameters as /tokenize.
+    
+    Texts are processed in batches of STREAM_BATCH_SIZE, so results are sent as
+    they become available rather than held in memory until all are complete.  If
+    a batch fails after the response has started, a final {"error", "index"} line
+    is sent and the stream ends.
+    """
+    texts = [request.text] if isinstance(request, SingleTextTokenizeRequest) else request.texts
+    logger.info(f"streaming {len(texts)} texts with model: {request.model}")
+    
+    try:
+        # Load the tokenizer up front so loading errors are returned as a status code
+        tokenizer, cache_key = await anyio.to_thread.run_sync(load_request_tokenizer, request)
+        first_results = await anyio.to_thread.run_sync(
+            tokenize_texts, request, texts[:STREAM_BATCH_SIZE], tokenizer, cache_key, limiter=tokenize_limiter
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"error during text processing: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Text processing failed: {str(e)}")
+    
+    async def generate():
+        for result in first_results:
+            yield orjson.dumps(result) + b"\n"
+        
+        for start in range(STREAM_BATCH_SIZE, len(texts), STREAM_BATCH_SIZE):
+            try:
+                results = await anyio.to_thread.run_sync(
+                    tokenize_texts, request, texts[start:start + STREAM_BATCH_SIZE], tokenizer, cache_key,
+                    limiter=tokenize_limiter
+                )
+            except Exception as e:
+                # The response has already started, so end the stream with an error
+                # line identifying the first text that was not returned
+                logger.error(f"error during text processing: {str(e)}")
+                yield orjson.dumps({"error": f"Text processing failed: {str(e)}", "index": start}) + b"\n"
+                return
+            
+            for result in results:
+                yield orjson.dumps(result) + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 @app.head("/")
 @app.get("/")
@@ -326,7 +1101,14 @@ def main():
     """
     Run the FastAPI application with uvicorn.
     """
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=False)
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=False,
+        access_log=False,
+        log_level="warning"
+    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file